@@ -1,16 +1,110 @@
+import argparse
+import math
+import mmap
+import multiprocessing
 import os
 import random
-files = os.listdir('input_files/')
-l = len(files)
+import struct
+import time
+import tracemalloc
+from array import array
 
-for i in range(l):
-    files[i] = files[i][:-3]
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
+try:
+    import resource
+except ImportError:
+    resource = None
 
-def solve(m, p2, p3, p4, ing, shuff):
+
+# parsed inputs are cached next to the source as a flat int32 CSR layout: a header,
+# m + 1 offsets, the concatenated ingredient ids and the newline-joined id -> name table
+CACHE = '.csr'
+HEADER = struct.Struct('<8s8q')
+MAGIC = b'PIZZACSR'
+
+
+def parse(path):
+    ids = {}
+    offsets, flat = array('i', [0]), array('i')
+    with open(path, 'r') as f:
+        m, p2, p3, p4 = [int(x) for x in f.readline().split()]
+        for _, line in zip(range(m), f):
+            flat.extend([ids.setdefault(name, len(ids)) for name in line.split()[1:]])
+            offsets.append(len(flat))
+    return (m, p2, p3, p4), offsets, flat, list(ids)
+
+
+def _cached(path, st):
+    try:
+        with open(path + CACHE, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, mtime, m, p2, p3, p4, nflat, nnames = HEADER.unpack_from(mm)
+    except (OSError, ValueError, struct.error):
+        return None
+    i = HEADER.size
+    j = i + 4 * (m + 1)
+    k = j + 4 * nflat
+    if (magic, size, mtime, len(mm)) != (MAGIC, st.st_size, st.st_mtime_ns, k + nnames):
+        return None
+    view = memoryview(mm)
+    names = bytes(view[k:k + nnames]).decode().split('\n') if nnames else []
+    return (m, p2, p3, p4), view[i:j].cast('i'), view[j:k].cast('i'), names, True
+
+
+def csr(path, cache=True):
+    # returns the header, offsets, flat ids, names and whether they came from the cache;
+    # the cache is memory-mapped and rebuilt whenever the source size or mtime changes
+    st = os.stat(path)
+    hit = _cached(path, st) if cache else None
+    if hit:
+        return hit
+
+    head, offsets, flat, names = parse(path)
+    if cache:
+        # the cache only saves time, so a read-only directory or full disk is not fatal
+        table = '\n'.join(names).encode()
+        try:
+            with open(path + CACHE + '.tmp', 'wb') as f:
+                f.write(HEADER.pack(MAGIC, st.st_size, st.st_mtime_ns, *head, len(flat), len(table)))
+                offsets.tofile(f)
+                flat.tofile(f)
+                f.write(table)
+            os.replace(path + CACHE + '.tmp', path + CACHE)
+        except OSError:
+            pass
+    return head, offsets, flat, names, False
+
+
+def _bitcount(x):
+    return bin(x).count('1')
+
+
+# int.bit_count is Python 3.10+; older interpreters count the digits of bin()
+bitcount = getattr(int, 'bit_count', _bitcount)
+
+
+def load(path, cache=True):
+    # ingredients are interned to dense ids and each pizza becomes an int bitmask,
+    # so a team's distinct-ingredient count is an OR plus a popcount. also returns how
+    # many pizzas hold each ingredient.
+    (m, p2, p3, p4), offsets, flat, names, _ = csr(path, cache)
+    masks = []
+    for j in range(m):
+        mask = 0
+        for t in flat[offsets[j]:offsets[j + 1]]:
+            mask |= 1 << t
+        masks.append(mask)
+    return m, p2, p3, p4, masks, frequency(flat, len(names))
+
+
+def solve(m, p2, p3, p4, ing, shuff, rng=random):
     i, score = 0, 0
 
-    random.shuffle(shuff)
+    rng.shuffle(shuff)
 
     pp, ppp, pppp = [], [], []
 
@@ -19,19 +113,19 @@ def solve(m, p2, p3, p4, ing, shuff):
         if i + 2 <= m and p2 > 0:
             p2 -= 2
             pp.append([shuff[i], shuff[i + 1]])
-            ss = len(set(ing[shuff[i]] + ing[shuff[i + 1]]))
+            ss = bitcount(ing[shuff[i]] | ing[shuff[i + 1]])
             i += 2
 
         elif i + 3 <= m and p3 > 0:
             p3 -= 3
             ppp.append([shuff[i], shuff[i + 1], shuff[i + 2]])
-            ss = len(set(ing[shuff[i]] + ing[shuff[i + 1]] + ing[shuff[i + 2]]))
+            ss = bitcount(ing[shuff[i]] | ing[shuff[i + 1]] | ing[shuff[i + 2]])
             i += 3
 
         elif i + 4 <= m and p4 > 0:
             p4 -= 4
             pppp.append([shuff[i], shuff[i + 1], shuff[i + 2], shuff[i + 3]])
-            ss = len(set(ing[shuff[i]] + ing[shuff[i + 1]] + ing[shuff[i + 2]] + ing[shuff[i + 3]]))
+            ss = bitcount(ing[shuff[i]] | ing[shuff[i + 1]] | ing[shuff[i + 2]] | ing[shuff[i + 3]])
             i += 4
 
 
@@ -43,46 +137,578 @@ def solve(m, p2, p3, p4, ing, shuff):
     return len(pp), len(ppp), len(pppp), pp, ppp, pppp, score
 
 
-for i in range(l):
+def pack(ing):
+    # M x W uint64 matrix of the pizza bitmasks, W = ceil(ingredients / 64)
+    width = max(1, (max(ing, default=0).bit_length() + 63) // 64)
+    data = b''.join(x.to_bytes(8 * width, 'little') for x in ing)
+    return np.frombuffer(data, dtype='<u8').reshape(len(ing), width)
+
+
+def popcount(rows):
+    # set bits per row of a uint64 array, summed over the last axis
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(rows).sum(axis=-1, dtype=np.int64)
+    table = np.array([bin(x).count('1') for x in range(256)], dtype=np.uint8)
+    return table[rows.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def evaluate(n2, n3, n4, packed, perms):
+    # scores K candidate assignments at once: perms is K x M, its leading 2 * n2 columns
+    # are the 2-person teams, then the 3s and 4s, exactly as solve() lays them out
+    k, score, at = len(perms), np.zeros(len(perms), dtype=np.int64), 0
+    for size, n in ((2, n2), (3, n3), (4, n4)):
+        if n:
+            teams = packed[perms[:, at:at + size * n]].reshape(k, n, size, packed.shape[1])
+            score += (popcount(np.bitwise_or.reduce(teams, axis=2)) ** 2).sum(axis=1)
+            at += size * n
+    return score, int(score.argmax())
+
+
+def batched(m, n2, n3, n4, packed, n, batch=None, seed=None, memory=2 ** 28, deadline=None, improve=None):
+    # n random restarts over the pack()ed pizzas, scored `batch` permutations at a time.
+    # per permutation a batch holds 4 * m bytes of int32 order, plus for every served
+    # pizza its gathered W * 8 byte row, an 8 byte gather index, up to W * 4 bytes of
+    # OR-reduced team rows and as much again for popcount()'s byte-table lookup on NumPy
+    # < 2.0; by default batch is sized to keep that within `memory`.
+    used = 2 * n2 + 3 * n3 + 4 * n4
+    if batch is None:
+        batch = max(1, memory // (4 * m + used * (16 * packed.shape[1] + 8)))
+    rng = np.random.default_rng(seed)
+    base = np.arange(m, dtype=np.int32)
+    result = 0, [], [], []
+
+    for start in range(0, n, batch):
+        if start and deadline is not None and time.time() > deadline:
+            break
+        perms = np.tile(base, (min(batch, n - start), 1))
+        rng.permuted(perms, axis=1, out=perms)
+        score, i = evaluate(n2, n3, n4, packed, perms)
+
+        if score[i] > result[0]:
+            best = perms[i].tolist()
+            two = [best[2 * j:2 * j + 2] for j in range(n2)]
+            three = [best[2 * n2 + 3 * j:2 * n2 + 3 * j + 3] for j in range(n3)]
+            four = [best[2 * n2 + 3 * n3 + 4 * j:2 * n2 + 3 * n3 + 4 * j + 4] for j in range(n4)]
+            result = int(score[i]), two, three, four
+            if improve:
+                improve(result)
+
+    return result
 
-    with open('input_files/' + files[i] + '.in', 'r') as f:
 
-        content = f.readlines()
-        ingredients = []
-        m, p2, p3, p4 = [int(x) for x in content[0].split()]
-        for j in range(1, m + 1):
-            ingredient = content[j].split()[1:]
-            ingredients.append((ingredient))
+def bits(mask):
+    out = []
+    while mask:
+        low = mask & -mask
+        out.append(low.bit_length() - 1)
+        mask ^= low
+    return out
 
-    bscore = 0
-    btwo, bthree, bfour = [], [], []
-    val = list(range(m))
 
-    for _ in range(10000):
-        q2, q3, q4, two, three, four, score = solve(m, 2 * p2, 3 * p3, 4 * p4, ingredients, val)
+def mix(m, p2, p3, p4):
+    # the team counts solve() ends up serving: 2s first, then 3s, then 4s
+    n2 = min(p2, m // 2)
+    n3 = min(p3, (m - 2 * n2) // 3)
+    n4 = min(p4, (m - 2 * n2 - 3 * n3) // 4)
+    return n2, n3, n4
+
+
+def frequency(flat, n):
+    counts = [0] * n
+    for t in flat:
+        counts[t] += 1
+    return counts
+
+
+def plan(m, p2, p3, p4, freq, keep=3):
+    # ranks feasible team mixes 2 * n2 + 3 * n3 + 4 * n4 <= m by expected score. a team of
+    # k random pizzas holds ingredient t with p = 1 - (1 - f_t) ** k, so its squared
+    # distinct count has mean E ** 2 + Var with E = sum(p) and Var = sum(p * (1 - p)).
+    # the total is linear in (n2, n3, n4), so for every n4 only the breakpoints in n3
+    # where n2 stops being capped by p2 need checking. mixes with room left for another
+    # team are dropped: adding that team can only score more.
+    hist = {}
+    for c in freq:
+        if c:
+            hist[c] = hist.get(c, 0) + 1
+    gain = [0.0] * 5
+    for k in (2, 3, 4):
+        e = v = 0.0
+        for c, n in hist.items():
+            p = 1 - (1 - c / m) ** k
+            e += n * p
+            v += n * p * (1 - p)
+        gain[k] = e * e + v
+
+    best = {}
+    for n4 in range(min(p4, m // 4) + 1):
+        r = m - 4 * n4
+        top = min(p3, r // 3)
+        cut = (r - 2 * p2) // 3
+        for n3 in {0, top, cut, cut + 1}:
+            if 0 <= n3 <= top:
+                n2 = min(p2, (r - 3 * n3) // 2)
+                left = r - 3 * n3 - 2 * n2
+                if n2 < p2 and left >= 2 or n3 < p3 and left >= 3 or n4 < p4 and left >= 4:
+                    continue
+                best[n2, n3, n4] = n2 * gain[2] + n3 * gain[3] + n4 * gain[4]
+
+    return sorted(best, key=lambda x: -best[x])[:keep]
+
+
+def greedy(m, n2, n3, n4, ing, pool=32, rare=3):
+    # deterministic construction: each team is seeded with the biggest unused pizza and
+    # grown with the candidate adding the most new ingredients. candidates are the next
+    # `pool` unused pizzas by topping count plus the biggest unused pizzas holding the
+    # `rare` scarcest ingredients the team still lacks, taken from an inverted index.
+    # equal gains go to the pizza with fewer toppings, and the smallest unused pizza is
+    # always a candidate, so a team that has run out of new ingredients takes a small one.
+    tops = [bits(x) for x in ing]
+    order = sorted(range(m), key=lambda x: -len(tops[x]))
+    index = [[] for _ in range(max(map(max, filter(None, tops)), default=-1) + 1)]
+    for p in order:
+        for t in tops[p]:
+            index[t].append(p)
+    left = [len(x) for x in index]
+    scarce = sorted(range(len(index)), key=lambda t: left[t])
+    ptr = [0] * len(index)
+    used = bytearray(m)
+    head, tail, rhead, score = 0, m - 1, 0, 0
+    teams = {2: [], 3: [], 4: []}
+
+    def take(p):
+        used[p] = 1
+        for t in tops[p]:
+            left[t] -= 1
+
+    for size in [4] * n4 + [3] * n3 + [2] * n2:
+        while used[order[head]]:
+            head += 1
+        p = order[head]
+        take(p)
+        team, cur, have = [p], ing[p], set(tops[p])
+
+        while len(team) < size:
+            while used[order[tail]]:
+                tail -= 1
+            best = order[tail]
+            gain = bitcount(ing[best] & ~cur)
+            j, seen = head, 0
+            while j < m and seen < pool:
+                q = order[j]
+                j += 1
+                if used[q]:
+                    continue
+                seen += 1
+                if len(tops[q]) < gain:
+                    break
+                g = bitcount(ing[q] & ~cur)
+                if g > gain or g == gain and len(tops[q]) < len(tops[best]):
+                    best, gain = q, g
+
+            while rhead < len(scarce) and not left[scarce[rhead]]:
+                rhead += 1
+            r, found = rhead, 0
+            while r < len(scarce) and found < rare and r - rhead < 4 * pool:
+                t = scarce[r]
+                r += 1
+                if not left[t] or t in have:
+                    continue
+                found += 1
+                posting = index[t]
+                while used[posting[ptr[t]]]:
+                    ptr[t] += 1
+                for q in posting[ptr[t]:ptr[t] + pool]:
+                    if used[q] or len(tops[q]) < gain:
+                        continue
+                    g = bitcount(ing[q] & ~cur)
+                    if g > gain or g == gain and len(tops[q]) < len(tops[best]):
+                        best, gain = q, g
+
+            take(best)
+            team.append(best)
+            cur |= ing[best]
+            have.update(tops[best])
+
+        score += bitcount(cur) ** 2
+        teams[size].append(team)
+
+    return score, teams[2], teams[3], teams[4]
+
+
+def anneal(m, two, three, four, ing, moves=100000, t0=0.2, t1=0.01, seed=None, deadline=None,
+           improve=None, every=1.0):
+    # simulated annealing over pizza swaps between two teams or a team and the unused
+    # pool. every team keeps per-ingredient reference counts, so a swap is priced by
+    # walking the two pizzas' toppings only. temperatures are in distinct ingredients
+    # per team and cool geometrically from t0 to t1 over the move budget. a deadline
+    # (time.time()) ends the run early with the best assignment seen so far. new bests
+    # are passed to improve() at most once every `every` seconds.
+    rng = random.Random(seed)
+    tops = [bits(x) for x in ing]
+    tset = [set(x) for x in tops]
+    teams = [list(t) for t in two + three + four]
+    where, slot = [-1] * m, [0] * m
+    counts, size = [], []
+
+    for k, team in enumerate(teams):
+        c = {}
+        for i, p in enumerate(team):
+            where[p], slot[p] = k, i
+            for t in tops[p]:
+                c[t] = c.get(t, 0) + 1
+        counts.append(c)
+        size.append(len(c))
+
+    def delta(k, a, b):
+        c, sa, sb, d = counts[k], tset[a], tset[b], 0
+        for t in tops[a]:
+            if c[t] == 1 and t not in sb:
+                d -= 1
+        for t in tops[b]:
+            if t not in c and t not in sa:
+                d += 1
+        return d
+
+    def swap(k, a, b):
+        c = counts[k]
+        for t in tops[a]:
+            if c[t] == 1:
+                del c[t]
+            else:
+                c[t] -= 1
+        for t in tops[b]:
+            c[t] = c.get(t, 0) + 1
+        size[k] = len(c)
+        teams[k][slot[a]] = b
+
+    score = sum(x * x for x in size)
+    bscore, bteams = score, None
+    scale = 2 * math.sqrt(score / len(teams)) if teams else 1
+    temp, cool = t0, (t1 / t0) ** (1 / moves) if moves else 1
+    n2, n3 = len(two), len(two) + len(three)
+    start, done = time.perf_counter(), 0
+    reported, last = bscore, start
+
+    for done in range(1, moves + 1 if teams else 0):
+        if not done & 1023:
+            if improve and bscore > reported and time.perf_counter() - last >= every:
+                snap = bteams or [list(t) for t in teams]
+                improve((bscore, snap[:n2], snap[n2:n3], snap[n3:]))
+                reported, last = bscore, time.perf_counter()
+            if deadline is not None and time.time() > deadline:
+                break
+        temp *= cool
+        ka = rng.randrange(len(teams))
+        a = teams[ka][rng.randrange(len(teams[ka]))]
+        b = rng.randrange(m)
+        kb = where[b]
+        if kb == ka:
+            continue
+
+        da = delta(ka, a, b)
+        d = (size[ka] + da) ** 2 - size[ka] ** 2
+        if kb >= 0:
+            db = delta(kb, b, a)
+            d += (size[kb] + db) ** 2 - size[kb] ** 2
+
+        if d < 0 and rng.random() >= math.exp(d / (temp * scale)):
+            continue
+        if d < 0 and score == bscore and bteams is None:
+            bteams = [list(t) for t in teams]
+
+        sa, sb = slot[a], slot[b]
+        swap(ka, a, b)
+        if kb >= 0:
+            swap(kb, b, a)
+        where[a], where[b], slot[a], slot[b] = kb, ka, sb, sa
+        score += d
+
+        if score > bscore:
+            bscore, bteams = score, None
+
+    rate = done / max(time.perf_counter() - start, 1e-9)
+    if bteams is None:
+        bteams = teams
+    return bscore, bteams[:n2], bteams[n2:n3], bteams[n3:], rate
+
+
+# read-only per-worker copy of the parsed pizzas, set once by the pool initializer
+_shared = None
+
+
+def _init(m, p2, p3, p4, ing):
+    global _shared
+    _shared = m, p2, p3, p4, ing
+
+
+def restarts(m, p2, p3, p4, ing, n, seed=None, deadline=None, improve=None):
+    # the deadline is only checked after the first restart, so every call yields an answer
+    rng = random.Random(seed)
+    shuff = list(range(m))
+    bscore, btwo, bthree, bfour = 0, [], [], []
+
+    for k in range(n):
+        if k and deadline is not None and time.time() > deadline:
+            break
+        q2, q3, q4, two, three, four, score = solve(m, 2 * p2, 3 * p3, 4 * p4, ing, shuff, rng)
 
         if score > bscore:
             bscore, btwo, bthree, bfour = score, two, three, four
+            if improve:
+                improve((bscore, btwo, bthree, bfour))
+
+    return bscore, btwo, bthree, bfour
+
+
+def _work(task):
+    return restarts(*_shared, *task)
+
+
+def search(m, p2, p3, p4, ing, n, workers=1, seed=None, deadline=None, improve=None, chunk=32):
+    # in a pool the restarts go out in rounds of `chunk` per worker, worker k of round c
+    # seeded with seed + c * workers + k, and improve() sees each round's new best. ties
+    # go to the earliest round and lowest k, so a given (workers, seed) pair always gives
+    # the same answer.
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if workers == 1:
+        return restarts(m, p2, p3, p4, ing, n, seed, deadline, improve)
+
+    best = 0, [], [], []
+    with multiprocessing.Pool(workers, _init, (m, p2, p3, p4, ing)) as pool:
+        for c, at in enumerate(range(0, n, workers * chunk)):
+            if c and deadline is not None and time.time() > deadline:
+                break
+            size = min(workers * chunk, n - at)
+            tasks = [(size // workers + (k < size % workers), seed + c * workers + k, deadline)
+                     for k in range(workers)]
+            result = max(pool.map(_work, tasks, chunksize=1), key=lambda r: r[0])
+
+            if result[0] > best[0]:
+                best = result
+                if improve:
+                    improve(best)
+
+    return best
+
+
+def check(path, m, p2, p3, p4, ing):
+    # streams an answer file and returns its score and teams, raising ValueError on the
+    # first broken rule: header count, team size and line length, teams per size,
+    # pizza ids in range and every pizza delivered at most once
+    limit = {2: p2, 3: p3, 4: p4}
+    teams = {2: [], 3: [], 4: []}
+    seen = bytearray(m)
+    total = count = 0
+
+    with open(path, 'r') as f:
+        head = f.readline().split()
+        if len(head) != 1 or not head[0].isdigit():
+            raise ValueError('%s:1: expected the number of teams' % path)
+        d = int(head[0])
+
+        for n, line in enumerate(f, 2):
+            try:
+                row = [int(x) for x in line.split()]
+            except ValueError:
+                raise ValueError('%s:%d: not a list of integers' % (path, n)) from None
+            if not row:
+                continue
+            if count == d:
+                raise ValueError('%s:%d: more teams than the %d in the header' % (path, n, d))
+            size = row[0]
+            if size not in limit or len(row) != size + 1:
+                raise ValueError('%s:%d: expected a team size of 2-4 and that many pizzas' % (path, n))
+            if len(teams[size]) == limit[size]:
+                raise ValueError('%s:%d: more than %d teams of %d' % (path, n, limit[size], size))
+
+            mask = 0
+            for p in row[1:]:
+                if not 0 <= p < m:
+                    raise ValueError('%s:%d: pizza %d does not exist' % (path, n, p))
+                if seen[p]:
+                    raise ValueError('%s:%d: pizza %d delivered twice' % (path, n, p))
+                seen[p] = 1
+                mask |= ing[p]
+            total += bitcount(mask) ** 2
+            teams[size].append(row[1:])
+            count += 1
+
+    if count != d:
+        raise ValueError('%s: header says %d teams, found %d' % (path, d, count))
+    return total, teams[2], teams[3], teams[4]
+
+
+def read(path, m, p2, p3, p4, ing):
+    # score and teams of an existing output file, or None if it is missing or invalid
+    try:
+        return check(path, m, p2, p3, p4, ing)
+    except (OSError, ValueError):
+        return None
+
+
+def write(path, two, three, four):
+    # built in memory and written in one call, to a temporary file first so an
+    # interrupted checkpoint never leaves a truncated answer behind
+    lines = [str(len(two) + len(three) + len(four))]
+    for size, teams in ((2, two), (3, three), (4, four)):
+        prefix = str(size) + ' '
+        lines.extend(prefix + ' '.join(map(str, team)) for team in teams)
+    with open(path + '.tmp', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def reset_peak():
+    # Linux restarts a process's peak RSS (VmHWM) from its current RSS when 5 is written
+    # to /proc/self/clear_refs; returns False where that is not possible
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def rss():
+    # peak resident set size of this process in bytes: VmHWM where /proc has it (so it
+    # honours reset_peak), else ru_maxrss since start, or 0 where neither can be read
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def measure(fn, *args, trace=False):
+    # runs fn and appends its wall time and peak memory to the result. the peak is the
+    # RSS high-water mark of this call alone, or with trace (or where the RSS peak cannot
+    # be reset) the Python heap high-water mark from tracemalloc, which is slower.
+    trace = trace or not reset_peak()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    else:
+        peak = rss()
+    return (*result, elapsed, peak)
+
+
+def run(name, args, deadline=None):
+    # solves one input, starting from the score of its existing output file and writing
+    # every strict improvement as soon as a solver reports it. with a deadline the solvers
+    # take turns on the mixes in slices of at most args.slice seconds until it passes.
+    m, p2, p3, p4, ingredients, freq, elapsed, peak = measure(load, 'input_files/' + name + '.in', args.cache,
+                                                              trace=args.trace_memory)
+    print("Loaded", name, "in %.3fs, peak %.1f MB" % (elapsed, peak / 2 ** 20))
+
+    out = 'output_files/' + name + '.out'
+    best = read(out, m, p2, p3, p4, ingredients)
+    if best:
+        print("Warm start", name, "\nScore :", best[0])
+    else:
+        best = 0, [], [], []
+
+    def checkpoint(result):
+        nonlocal best
+        if result[0] > best[0]:
+            best = result[:4]
+            write(out, *best[1:])
+
+    if args.mixes:
+        mixes = plan(m, p2, p3, p4, freq, args.mixes)
+    else:
+        mixes = [mix(m, p2, p3, p4)]
+
+    if args.restarts is not None:
+        restarts = args.restarts
+    else:
+        restarts = 2 ** 62 if deadline is not None else 10000
+    packed = pack(ingredients) if args.solver == 'batch' else None
+    # every solver call draws a fresh seed from here, so later rounds never repeat
+    # earlier ones and a fixed --seed still reproduces the whole run
+    seeds = random.Random(args.seed)
+    rnd = 0
+    while True:
+        for n2, n3, n4 in mixes:
+            until = None if deadline is None else min(deadline, time.time() + args.slice)
+            seed = seeds.randrange(2 ** 32)
+            if args.solver == 'greedy':
+                if rnd:
+                    continue
+                result = greedy(m, n2, n3, n4, ingredients, args.pool)
+            elif args.solver == 'batch':
+                result = batched(m, n2, n3, n4, packed, restarts, args.batch, seed, deadline=until,
+                                 improve=checkpoint)
+            else:
+                result = search(m, n2, n3, n4, ingredients, restarts, args.workers, seed, until, checkpoint)
+            print("Mix", (n2, n3, n4), "Score :", result[0])
+            checkpoint(result)
+
+        if args.anneal and best[0]:
+            until = None if deadline is None else min(deadline, time.time() + args.slice)
+            result = anneal(m, *best[1:], ingredients, args.anneal, args.t0, args.t1, seeds.randrange(2 ** 32),
+                            until, checkpoint)
+            print("Annealed", name, "\nMoves/s :", int(result[4]))
+            checkpoint(result)
+
+        rnd += 1
+        if deadline is None or time.time() >= deadline or (args.solver == 'greedy' and not args.anneal):
+            break
+
+    print("Done ", name, "\nScore :", best[0])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--restarts', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--solver', choices=['random', 'greedy', 'batch'], default='random')
+    parser.add_argument('--batch', type=int, default=None)
+    parser.add_argument('--pool', type=int, default=32)
+    parser.add_argument('--mixes', type=int, default=0, metavar='K')
+    parser.add_argument('--anneal', type=int, default=0, metavar='MOVES')
+    parser.add_argument('--t0', type=float, default=0.2)
+    parser.add_argument('--t1', type=float, default=0.01)
+    parser.add_argument('--no-cache', dest='cache', action='store_false')
+    parser.add_argument('--trace-memory', action='store_true')
+    parser.add_argument('--budget', type=float, default=None, metavar='SECONDS')
+    parser.add_argument('--file-budget', type=float, default=None, metavar='SECONDS')
+    parser.add_argument('--slice', type=float, default=10.0, metavar='SECONDS')
+    args = parser.parse_args()
+    if args.solver == 'batch' and np is None:
+        parser.error('--solver batch needs NumPy')
+
+    files = sorted(x[:-3] for x in os.listdir('input_files/') if x.endswith('.in'))
+    sizes = [os.path.getsize('input_files/' + name + '.in') for name in files]
+    end = None if args.budget is None else time.time() + args.budget
+
+    for i, name in enumerate(files):
+        # the global budget left is shared out by input size, so time a file does not
+        # use rolls over to the ones after it
+        deadline = None
+        if args.budget is not None:
+            deadline = time.time() + max(0, end - time.time()) * sizes[i] / sum(sizes[i:])
+        if args.file_budget is not None:
+            cap = time.time() + args.file_budget
+            deadline = cap if deadline is None else min(deadline, cap)
+
+        run(name, args, deadline)
+
+    print("Done and Dusted")
+
 
-    with open('output_files/' + files[i] + '.out', 'w') as f:
-        f.write(str(q2 + q3 + q4) + '\n')
-
-        for ii in range(q2):
-            f.write('2 ')
-            for j in range(2):
-                f.write(str(btwo[ii][j]) + ' ')
-            f.write('\n')
-        for ii in range(q3):
-            f.write('3 ')
-            for j in range(3):
-                f.write(str(bthree[ii][j]) + ' ')
-            f.write('\n')
-        for ii in range(q4):
-            f.write('4 ')
-            for j in range(4):
-                f.write(str(bfour[ii][j]) + ' ')
-            f.write('\n')
-
-    print("Done ", files[i], "\nScore :", bscore)
-
-print("Done and Dusted")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+import argparse
+import cProfile
+import json
+import multiprocessing
+import os
+import platform
+import random
+import signal
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import HashCode as hc
+
+FILES = ['a_example', 'b_little_bit_of_everything', 'c_many_ingredients', 'd_many_pizzas', 'e_many_teams']
+
+
+class Sampler:
+    # minimal SIGPROF sampling profiler: counts folded call stacks ("f;g;h n" lines, as
+    # read by flamegraph.pl and speedscope) every `interval` seconds of CPU time
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = Counter()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+            frame = frame.f_back
+        self.counts[';'.join(reversed(stack))] += 1
+
+    def enable(self):
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def disable(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def dump_stats(self, path):
+        with open(path, 'w') as f:
+            for stack, n in self.counts.most_common():
+                f.write('%s %d\n' % (stack, n))
+
+
+class Phase:
+    # times a block and, if asked, profiles it into <profile dir>/<file>.<phase>.prof|.folded
+    def __init__(self, args, name, phase):
+        self.path = os.path.join(args.profile_dir, name + '.' + phase)
+        self.profiler = {'cprofile': cProfile.Profile, 'sample': Sampler}.get(args.profile, lambda: None)()
+
+    def __enter__(self):
+        if self.profiler:
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        if self.profiler:
+            self.profiler.disable()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.profiler.dump_stats(self.path + ('.prof' if isinstance(self.profiler, cProfile.Profile) else '.folded'))
+
+
+def solve_random(m, mix, ing, args, trace, start):
+    rng, shuff, best, count = random.Random(args.seed), list(range(m)), (0, [], [], []), 0
+    n2, n3, n4 = mix
+    while time.perf_counter() - start < args.seconds:
+        *_, two, three, four, score = hc.solve(m, 2 * n2, 3 * n3, 4 * n4, ing, shuff, rng)
+        count += 1
+        if score > best[0]:
+            best = score, two, three, four
+            trace.append([round(time.perf_counter() - start, 4), score])
+    return best, count
+
+
+def solve_batch(m, mix, packed, args, trace, start):
+    best, count, seed = (0, [], [], []), 0, args.seed
+    while time.perf_counter() - start < args.seconds:
+        result = hc.batched(m, *mix, packed, args.batch, args.batch, seed)
+        count += args.batch
+        seed = None if seed is None else seed + 1
+        if result[0] > best[0]:
+            best = result
+            trace.append([round(time.perf_counter() - start, 4), best[0]])
+    return best, count
+
+
+def solve_greedy(m, mix, ing, args, trace, start):
+    best = hc.greedy(m, *mix, ing, args.pool)
+    trace.append([round(time.perf_counter() - start, 4), best[0]])
+    return best, 1
+
+
+def bench(name, args):
+    path = 'input_files/' + name + '.in'
+    record = {}
+
+    with Phase(args, name, 'parse') as phase:
+        hc.parse(path)
+    record['parse_s'] = phase.elapsed
+
+    hc.csr(path)
+    with Phase(args, name, 'load') as phase:
+        m, p2, p3, p4, ing, freq = hc.load(path)
+    record['load_s'] = phase.elapsed
+
+    mix = hc.mix(m, p2, p3, p4)
+    if args.mixes:
+        mix = hc.plan(m, p2, p3, p4, freq, 1)[0]
+    record['mix'] = list(mix)
+
+    trace = []
+    solver = {'random': solve_random, 'batch': solve_batch, 'greedy': solve_greedy}[args.solver]
+    data = hc.pack(ing) if args.solver == 'batch' else ing
+    with Phase(args, name, 'solve') as phase:
+        best, count = solver(m, mix, data, args, trace, time.perf_counter())
+    record['solve_s'] = phase.elapsed
+    record['restarts'] = count
+    record['restarts_per_s'] = count / phase.elapsed
+
+    if args.anneal and best[0]:
+        with Phase(args, name, 'anneal') as phase:
+            result = hc.anneal(m, *best[1:], ing, args.anneal, seed=args.seed)
+        record['anneal_s'] = phase.elapsed
+        record['moves_per_s'] = result[4]
+        if result[0] > best[0]:
+            best = result[:4]
+            trace.append([round(record['solve_s'] + phase.elapsed, 4), best[0]])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, name + '.out')
+        with Phase(args, name, 'write') as phase:
+            hc.write(out, *best[1:])
+        record['write_s'] = phase.elapsed
+        with Phase(args, name, 'check') as phase:
+            record['score'] = hc.check(out, m, p2, p3, p4, ing)[0]
+        record['check_s'] = phase.elapsed
+
+    record['trace'] = trace
+    # bench() runs in a fresh process per dataset, so this is that dataset's own peak
+    record['peak_rss_mb'] = hc.rss() / 2 ** 20
+    return record
+
+
+# runs that differ in any of these measure different things and are not compared
+SETTINGS = ('solver', 'seconds', 'seed', 'batch', 'pool', 'mixes', 'anneal', 'profile')
+
+
+def compare(old, new, tolerance, floor=0.01):
+    # lower scores or throughput, or higher times, beyond `tolerance` count as regressions;
+    # parse/load/write/check phases faster than `floor` seconds in the baseline are too
+    # noisy to judge
+    differ = [key for key in SETTINGS if old['meta']['args'].get(key) != new['meta']['args'].get(key)]
+    if differ:
+        raise ValueError('runs differ in %s' % ', '.join('--%s' % key for key in differ))
+    worse = []
+    phases = ('parse_s', 'load_s', 'write_s', 'check_s')
+    for name, rec in new['files'].items():
+        base = old['files'].get(name)
+        if not base:
+            continue
+        for key, higher in (('score', True), ('restarts_per_s', True), ('moves_per_s', True),
+                            ('parse_s', False), ('load_s', False), ('write_s', False), ('check_s', False)):
+            if key not in rec or key not in base or not base[key]:
+                continue
+            if key in phases and base[key] < floor:
+                continue
+            change = rec[key] / base[key] - 1
+            print('%-28s %-15s %14.4g -> %-14.4g %+7.1f%%' % (name, key, base[key], rec[key], 100 * change))
+            if (-change if higher else change) > tolerance:
+                worse.append((name, key))
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('files', nargs='*', default=FILES)
+    parser.add_argument('--solver', choices=['random', 'greedy', 'batch'], default='random')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch', type=int, default=64)
+    parser.add_argument('--pool', type=int, default=32)
+    parser.add_argument('--mixes', action='store_true')
+    parser.add_argument('--anneal', type=int, default=0, metavar='MOVES')
+    parser.add_argument('--profile', choices=['cprofile', 'sample'], default=None)
+    parser.add_argument('--profile-dir', default='profiles')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', default=None, metavar='JSON')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+    if args.solver == 'batch' and hc.np is None:
+        parser.error('--solver batch needs NumPy')
+    if args.profile == 'sample' and not hasattr(signal, 'setitimer'):
+        parser.error('--profile sample needs setitimer (Unix)')
+    # read the baseline before anything is written: --output may well be the same file
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, 'r') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error('cannot read --compare baseline: %s' % e)
+
+    result = {
+        'meta': {'python': sys.version.split()[0], 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'args': vars(args)},
+        'files': {},
+    }
+    # each dataset is benchmarked in a newly spawned interpreter, so its peak RSS and heap
+    # state are its own rather than carried over from the datasets before it
+    context = multiprocessing.get_context('spawn')
+    for name in args.files:
+        with context.Pool(1) as pool:
+            record = result['files'][name] = pool.apply(bench, (name, args))
+        print(name, "Score :", record['score'], "Restarts/s : %.1f" % record['restarts_per_s'])
+
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=1)
+
+    if baseline is not None:
+        try:
+            worse = compare(baseline, result, args.tolerance)
+        except ValueError as e:
+            print("Cannot compare :", e)
+            sys.exit(2)
+        if worse:
+            print("Regressions :", ', '.join('%s %s' % x for x in worse))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+import time
+
+import HashCode as hc
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pairs', nargs='*', metavar='IN OUT',
+                        help='input and output file pairs; defaults to every answer in output_files/')
+    parser.add_argument('--no-cache', dest='cache', action='store_false')
+    args = parser.parse_args()
+    if len(args.pairs) % 2:
+        parser.error('expected input and output files in pairs')
+
+    pairs = list(zip(args.pairs[::2], args.pairs[1::2]))
+    if not pairs:
+        pairs = [('input_files/' + x[:-4] + '.in', 'output_files/' + x)
+                 for x in sorted(os.listdir('output_files/')) if x.endswith('.out')]
+
+    failed = False
+    for source, answer in pairs:
+        start = time.perf_counter()
+        try:
+            m, p2, p3, p4, ing, freq = hc.load(source, args.cache)
+            score = hc.check(answer, m, p2, p3, p4, ing)[0]
+        except (OSError, ValueError) as e:
+            print(answer, "Invalid :", e)
+            failed = True
+            continue
+        print(answer, "Score :", score, "(%.3fs)" % (time.perf_counter() - start))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()